@@ -4,6 +4,7 @@ from flask_jwt_extended import JWTManager
 from config import config
 from models import db
 from utils.encryption import init_encryption_service
+from utils.warmup import warmup
 import os
 
 def create_app(config_name='development'):
@@ -15,7 +16,7 @@ def create_app(config_name='development'):
     CORS(app, origins=app.config['CORS_ORIGINS'], supports_credentials=True)
     jwt = JWTManager(app)
     
-    init_encryption_service(app.config['ENCRYPTION_KEY'])
+    init_encryption_service(app.config['ENCRYPTION_KEY'], cache_keys=app.config['ENCRYPTION_KEY_CACHE'])
     
     from routes.auth import auth_bp
     from routes.passwords import passwords_bp
@@ -69,8 +70,8 @@ def create_app(config_name='development'):
             }
         }), 200
     
-    with app.app_context():
-        db.create_all()
+    if os.getenv('FLASK_ENV') != 'testing':
+        warmup(app)
     
     return app
 
@@ -15,6 +15,7 @@ class Config:
     JWT_HEADER_NAME = 'Authorization'
     JWT_HEADER_TYPE = 'Bearer'
     ENCRYPTION_KEY = os.environ.get('ENCRYPTION_KEY')
+    ENCRYPTION_KEY_CACHE = os.environ.get('ENCRYPTION_KEY_CACHE', 'false').lower() == 'true'
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', '').split(',')
 
 config = {'development': Config, 'default': Config}
\ No newline at end of file
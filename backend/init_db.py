@@ -3,9 +3,9 @@ from models import db, User, Password
 from utils.encryption import get_encryption_service
 import sys
 
-def init_db():
-    app = create_app()
-    
+SEED_BATCH_SIZE = 500
+
+def init_db(app):
     with app.app_context():
         print("Creating database tables...")
         db.create_all()
@@ -24,9 +24,99 @@ def init_db():
         
         print("\n✓ Database initialization complete!")
 
-def seed_demo_data():
-    app = create_app()
-    
+def migrate_db(app):
+    with app.app_context():
+        print("\nMigrating database...")
+        
+        columns = {c['name']: c['type'] for c in db.inspect(db.engine).get_columns('passwords')}
+        if 'password_fingerprint' not in columns:
+            print("Adding password_fingerprint column...")
+            with db.engine.begin() as conn:
+                conn.execute(db.text("ALTER TABLE passwords ADD COLUMN password_fingerprint VARCHAR(64)"))
+            print("✓ password_fingerprint column added")
+        
+        foreign_keys = db.inspect(db.engine).get_foreign_keys('passwords')
+        has_cascade = any(fk['options'].get('ondelete') == 'CASCADE' for fk in foreign_keys)
+        if db.engine.dialect.name == 'sqlite' and not has_cascade:
+            # SQLite cannot alter a constraint, so rebuild the table with the cascading foreign key
+            print("Rebuilding passwords table with ON DELETE CASCADE...")
+            copied = ', '.join(name for name in columns if name in Password.__table__.c)
+            with db.engine.connect() as conn:
+                conn.execute(db.text("PRAGMA foreign_keys=OFF"))
+                conn.execute(db.text("ALTER TABLE passwords RENAME TO passwords_old"))
+                for index in db.inspect(conn).get_indexes('passwords_old'):
+                    conn.execute(db.text(f"DROP INDEX {index['name']}"))
+                Password.__table__.create(conn)
+                conn.execute(db.text(f"INSERT INTO passwords ({copied}) SELECT {copied} FROM passwords_old"))
+                conn.execute(db.text("DROP TABLE passwords_old"))
+                conn.commit()
+                conn.execute(db.text("PRAGMA foreign_keys=ON"))
+            print("✓ passwords table rebuilt")
+        
+        with db.engine.begin() as conn:
+            if db.engine.dialect.name == 'postgresql':
+                conn.execute(db.text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                conn.execute(db.text("ALTER TABLE passwords DROP CONSTRAINT IF EXISTS passwords_user_id_fkey"))
+                conn.execute(db.text(
+                    "ALTER TABLE passwords ADD CONSTRAINT passwords_user_id_fkey "
+                    "FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE"
+                ))
+                if not isinstance(columns['encrypted_password'], db.LargeBinary):
+                    print("Converting encrypted_password to BYTEA...")
+                    conn.execute(db.text(
+                        "ALTER TABLE passwords ALTER COLUMN encrypted_password TYPE BYTEA "
+                        "USING convert_to(encrypted_password, 'UTF8')"
+                    ))
+            elif db.engine.dialect.name == 'sqlite':
+                conn.execute(db.text(
+                    "UPDATE passwords SET encrypted_password = CAST(encrypted_password AS BLOB) "
+                    "WHERE typeof(encrypted_password) = 'text'"
+                ))
+            conn.execute(db.text("DROP INDEX IF EXISTS ix_passwords_user_id"))
+            
+            indexes = {i['name']: i['column_names'] for i in db.inspect(conn).get_indexes('passwords')}
+            if 'id' not in indexes.get('ix_passwords_user_updated', ['id']):
+                print("Rebuilding ix_passwords_user_updated with id...")
+                conn.execute(db.text("DROP INDEX ix_passwords_user_updated"))
+        
+        for index in Password.__table__.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+        print("✓ Indexes up to date")
+        
+        encryption_service = get_encryption_service()
+        
+        updates = []
+        for password in Password.query.all():
+            if password.password_fingerprint and encryption_service.is_current(password.encrypted_password):
+                continue
+            try:
+                password_text = encryption_service.decrypt(password.encrypted_password)
+            except Exception:
+                print(f"  Skipping password {password.id}: could not decrypt")
+                continue
+            updates.append({
+                'row_id': password.id,
+                'new_encrypted_password': encryption_service.encrypt(password_text),
+                'new_fingerprint': encryption_service.fingerprint(password.user_id, password_text)
+            })
+        
+        if updates:
+            table = Password.__table__
+            db.session.execute(
+                table.update()
+                .where(table.c.id == db.bindparam('row_id'))
+                .values(
+                    encrypted_password=db.bindparam('new_encrypted_password'),
+                    password_fingerprint=db.bindparam('new_fingerprint'),
+                    updated_at=table.c.updated_at
+                ),
+                updates
+            )
+        db.session.commit()
+        print(f"✓ Re-encrypted and fingerprinted {len(updates)} passwords")
+        print("\n✓ Database migration complete!")
+
+def seed_demo_data(app):
     with app.app_context():
         print("\nSeeding demo data...")
         
@@ -68,34 +158,43 @@ def seed_demo_data():
             }
         ]
         
+        rows = []
         for pwd_data in demo_passwords:
             password_text = pwd_data.pop('password')
-            encrypted_password = encryption_service.encrypt(password_text)
-            
-            password = Password(
+            rows.append(Password(
                 user_id=demo_user.id,
-                encrypted_password=encrypted_password,
+                encrypted_password=encryption_service.encrypt(password_text),
+                password_fingerprint=encryption_service.fingerprint(demo_user.id, password_text),
                 **pwd_data
-            )
-            db.session.add(password)
+            ))
         
-        db.session.commit()
+        for start in range(0, len(rows), SEED_BATCH_SIZE):
+            db.session.bulk_save_objects(rows[start:start + SEED_BATCH_SIZE])
+            db.session.commit()
         print(f" Created {len(demo_passwords)} demo passwords")
         print("\n Demo data seeding complete!")
 
+COMMANDS = {
+    'init': init_db,
+    'migrate': migrate_db,
+    'seed': seed_demo_data
+}
+
 if __name__ == '__main__':
     if len(sys.argv) > 1:
-        command = sys.argv[1]
+        commands = sys.argv[1:]
         
-        if command == 'init':
-            init_db()
-        elif command == 'seed':
-            seed_demo_data()
+        unknown = [command for command in commands if command not in COMMANDS]
+        if unknown:
+            print(f"Unknown command: {unknown[0]}")
+            print("Available commands: init, migrate, seed")
         else:
-            print(f"Unknown command: {command}")
-            print("Available commands: init, seed")
+            app = create_app()
+            for command in commands:
+                COMMANDS[command](app)
     else:
-        print("Usage: python init_db.py [command]")
+        print("Usage: python init_db.py [command ...]")
         print("Commands:")
-        print("  init  - Initialize database tables")
-        print("  seed  - Seed demo data")
\ No newline at end of file
+        print("  init     - Initialize database tables (run once before starting the API)")
+        print("  migrate  - Apply schema changes to an existing database")
+        print("  seed     - Seed demo data")
\ No newline at end of file
@@ -1,9 +1,34 @@
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from collections import OrderedDict
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.engine import Engine
+from werkzeug.security import check_password_hash
+import base64
+import hashlib
+import sqlite3
+import threading
+import time
 
 db = SQLAlchemy()
 
+@db.event.listens_for(Engine, 'connect')
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite ignores ON DELETE CASCADE, which User.passwords relies on, unless this is on
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+PASSWORD_CHECK_CACHE_TTL = 60
+PASSWORD_CHECK_CACHE_SIZE = 4096
+
+_PH = PasswordHasher(time_cost=2, memory_cost=64 * 1024, parallelism=2)
+
+_password_check_cache = OrderedDict()
+_password_check_lock = threading.Lock()
+
 class User(db.Model):
     __tablename__ = 'users'
     
@@ -13,13 +38,60 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    passwords = db.relationship('Password', backref='user', lazy=True, cascade='all, delete-orphan')
+    passwords = db.relationship(
+        'Password',
+        back_populates='user',
+        lazy='select',
+        cascade='all, delete-orphan',
+        passive_deletes=True
+    )
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = _PH.hash(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        # Keyed on the stored hash so entries die with it when the password changes
+        password_digest = hashlib.sha256(password.encode()).digest()
+        cache_key = (self.id, self.password_hash, password_digest)
+        now = time.monotonic()
+        
+        with _password_check_lock:
+            expires_at = _password_check_cache.get(cache_key)
+            if expires_at is not None:
+                if expires_at > now:
+                    _password_check_cache.move_to_end(cache_key)
+                    return True
+                del _password_check_cache[cache_key]
+        
+        if not self._verify_password(password):
+            return False
+        
+        if self.id is not None:
+            cache_key = (self.id, self.password_hash, password_digest)
+            with _password_check_lock:
+                _password_check_cache[cache_key] = now + PASSWORD_CHECK_CACHE_TTL
+                _password_check_cache.move_to_end(cache_key)
+                while len(_password_check_cache) > PASSWORD_CHECK_CACHE_SIZE:
+                    _password_check_cache.popitem(last=False)
+        
+        return True
+    
+    def _verify_password(self, password):
+        # Hashes from before the switch to Argon2id are Werkzeug hashes; upgrade them on login
+        if not self.password_hash.startswith('$argon2'):
+            if not check_password_hash(self.password_hash, password):
+                return False
+            self.set_password(password)
+            return True
+        
+        try:
+            _PH.verify(self.password_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
+        
+        if _PH.check_needs_rehash(self.password_hash):
+            self.set_password(password)
+        return True
     
     def to_dict(self):
         return {
@@ -33,12 +105,13 @@ class Password(db.Model):
     __tablename__ = 'passwords'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     service_name = db.Column(db.String(100), nullable=False)
     website_url = db.Column(db.String(500))
     username = db.Column(db.String(255))
     email_address = db.Column(db.String(255))
-    encrypted_password = db.Column(db.Text, nullable=False)
+    encrypted_password = db.Column(db.LargeBinary, nullable=False)
+    password_fingerprint = db.Column(db.String(64), index=True)
     notes = db.Column(db.Text)
     category = db.Column(db.String(50), default='Personal')
     is_weak = db.Column(db.Boolean, default=False)
@@ -47,6 +120,21 @@ class Password(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     last_used = db.Column(db.DateTime)
     
+    user = db.relationship('User', back_populates='passwords')
+    
+    __table_args__ = (
+        db.Index('ix_passwords_user_health', user_id, is_weak, is_reused),
+        db.Index('ix_passwords_user_updated', user_id, updated_at.desc(), id.desc()),
+        *(
+            db.Index(
+                f'ix_passwords_{column}_trgm', column,
+                postgresql_using='gin',
+                postgresql_ops={column: 'gin_trgm_ops'}
+            ).ddl_if(dialect='postgresql')
+            for column in ('service_name', 'username', 'email_address')
+        ),
+    )
+    
     def to_dict(self, include_password=False):
         data = {
             'id': self.id,
@@ -63,5 +151,11 @@ class Password(db.Model):
             'last_used': self.last_used.isoformat() if self.last_used else None
         }
         if include_password:
-            data['encrypted_password'] = self.encrypted_password
-        return data
\ No newline at end of file
+            data['encrypted_password'] = base64.b64encode(self.encrypted_password).decode()
+        return data
+
+db.event.listen(
+    Password.__table__,
+    'before_create',
+    db.DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql')
+)
\ No newline at end of file
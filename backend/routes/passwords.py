@@ -1,25 +1,95 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import db, Password
-from utils.encryption import get_encryption_service, PasswordStrengthChecker
+from utils.encryption import get_encryption_service, PasswordStrengthChecker, SPECIAL_CHARACTERS
 from datetime import datetime
+from functools import wraps
+import logging
+import orjson
 import secrets
 import string
 
 passwords_bp = Blueprint('passwords', __name__, url_prefix='/api/passwords')
 
+logger = logging.getLogger('passwords')
+logger.setLevel(logging.INFO)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+LIST_COLUMNS = (
+    Password.id,
+    Password.service_name,
+    Password.website_url,
+    Password.username,
+    Password.email_address,
+    Password.notes,
+    Password.category,
+    Password.is_weak,
+    Password.is_reused,
+    Password.created_at,
+    Password.updated_at,
+    Password.last_used
+)
+
+def with_user_id(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        return view(int(get_jwt_identity()), *args, **kwargs)
+    return wrapper
+
+def _encode_cursor(row):
+    return f"{row.updated_at.isoformat()}_{row.id}"
+
+def _decode_cursor(cursor):
+    updated_at, password_id = cursor.rsplit('_', 1)
+    return datetime.fromisoformat(updated_at), int(password_id)
+
+LIST_FIELDS = tuple(column.key for column in LIST_COLUMNS)
+
+REQUIRED_CLASSES = (string.ascii_lowercase, string.ascii_uppercase, string.digits)
+ALPHABET = string.ascii_lowercase + string.ascii_uppercase + string.digits
+ALPHABET_WITH_SPECIAL = ALPHABET + SPECIAL_CHARACTERS
+
+_system_random = secrets.SystemRandom()
+
+def _random_chars(alphabet, count):
+    # Bytes at or above the largest multiple of len(alphabet) would bias the modulo, so drop them
+    size = len(alphabet)
+    limit = 256 - 256 % size
+    chars = []
+    while len(chars) < count:
+        chars.extend(alphabet[b % size] for b in secrets.token_bytes(2 * count) if b < limit)
+    return chars[:count]
+
 @passwords_bp.route('/', methods=['GET'])
 @jwt_required()
-def get_all_passwords():
+@with_user_id
+def get_all_passwords(current_user_id):
     try:
-        print("=== GET ALL PASSWORDS ===")
-        current_user_id = int(get_jwt_identity())
-        print(f"Current user ID: {current_user_id}")
+        logger.debug("Listing passwords for user %s", current_user_id)
         
         category = request.args.get('category')
         search = request.args.get('search')
+        cursor = request.args.get('cursor')
+        
+        try:
+            limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return jsonify({'error': 'Invalid limit'}), 400
+        
+        limit = max(1, min(MAX_PAGE_SIZE, limit))
         
-        query = Password.query.filter_by(user_id=current_user_id)
+        query = Password.query.with_entities(*LIST_COLUMNS).filter_by(user_id=current_user_id)
+        
+        if cursor:
+            try:
+                cursor_updated_at, cursor_id = _decode_cursor(cursor)
+            except ValueError:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            query = query.filter(
+                db.tuple_(Password.updated_at, Password.id) < db.tuple_(cursor_updated_at, cursor_id)
+            )
         
         if category:
             query = query.filter_by(category=category)
@@ -33,25 +103,48 @@ def get_all_passwords():
                 )
             )
         
-        passwords = query.order_by(Password.updated_at.desc()).all()
-        print(f"Found {len(passwords)} passwords")
-        
-        return jsonify({
-            'passwords': [p.to_dict() for p in passwords],
-            'count': len(passwords)
-        }), 200
+        rows = query.order_by(Password.updated_at.desc(), Password.id.desc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        logger.debug("Found %d passwords", len(rows))
+        
+        return current_app.response_class(
+            orjson.dumps({
+                'passwords': [dict(zip(LIST_FIELDS, row)) for row in rows],
+                'count': len(rows),
+                'next_cursor': _encode_cursor(rows[-1]) if has_more else None
+            }),
+            status=200,
+            mimetype='application/json'
+        )
         
     except Exception as e:
-        print(f"ERROR: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Failed to fetch passwords: %s", e)
         return jsonify({'error': f'Failed to fetch passwords: {str(e)}'}), 500
 
 @passwords_bp.route('/<int:password_id>/', methods=['GET'])
 @jwt_required()
-def get_password(password_id):
+@with_user_id
+def get_password(current_user_id, password_id):
+    try:
+        password = Password.query.filter_by(id=password_id, user_id=current_user_id).first()
+        
+        if not password:
+            return jsonify({'error': 'Password not found'}), 404
+        
+        password.last_used = datetime.utcnow()
+        db.session.commit()
+        
+        return jsonify(password.to_dict(include_password=True)), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Failed to fetch password: {str(e)}'}), 500
+
+@passwords_bp.route('/<int:password_id>/decrypt/', methods=['GET'])
+@jwt_required()
+@with_user_id
+def decrypt_password(current_user_id, password_id):
     try:
-        current_user_id = int(get_jwt_identity())
         password = Password.query.filter_by(id=password_id, user_id=current_user_id).first()
         
         if not password:
@@ -69,13 +162,13 @@ def get_password(password_id):
         return jsonify(password_dict), 200
         
     except Exception as e:
-        return jsonify({'error': f'Failed to fetch password: {str(e)}'}), 500
+        return jsonify({'error': f'Failed to decrypt password: {str(e)}'}), 500
 
 @passwords_bp.route('/', methods=['POST'])
 @jwt_required()
-def create_password():
+@with_user_id
+def create_password(current_user_id):
     try:
-        current_user_id = int(get_jwt_identity())
         data = request.get_json()
         
         if not data:
@@ -92,16 +185,11 @@ def create_password():
         
         strength = PasswordStrengthChecker.check_strength(password_text)
         
-        existing_passwords = Password.query.filter_by(user_id=current_user_id).all()
-        decrypted_passwords = []
-        for p in existing_passwords:
-            try:
-                decrypted = encryption_service.decrypt(p.encrypted_password)
-                decrypted_passwords.append(decrypted)
-            except:
-                continue
-        
-        is_reused = PasswordStrengthChecker.is_reused(password_text, decrypted_passwords)
+        fingerprint = encryption_service.fingerprint(current_user_id, password_text)
+        is_reused = db.session.query(Password.id).filter_by(
+            user_id=current_user_id,
+            password_fingerprint=fingerprint
+        ).first() is not None
         
         password = Password(
             user_id=current_user_id,
@@ -110,6 +198,7 @@ def create_password():
             username=data.get('username', '').strip(),
             email_address=data.get('email_address', '').strip(),
             encrypted_password=encrypted_password,
+            password_fingerprint=fingerprint,
             notes=data.get('notes', ''),
             category=data.get('category', 'Personal'),
             is_weak=strength['is_weak'],
@@ -131,17 +220,18 @@ def create_password():
 
 @passwords_bp.route('/<int:password_id>/', methods=['DELETE'])
 @jwt_required()
-def delete_password(password_id):
+@with_user_id
+def delete_password(current_user_id, password_id):
     try:
-        current_user_id = int(get_jwt_identity())
-        password = Password.query.filter_by(id=password_id, user_id=current_user_id).first()
+        deleted = Password.query.filter_by(
+            id=password_id,
+            user_id=current_user_id
+        ).delete(synchronize_session=False)
+        db.session.commit()
         
-        if not password:
+        if not deleted:
             return jsonify({'error': 'Password not found'}), 404
         
-        db.session.delete(password)
-        db.session.commit()
-        
         return jsonify({'message': 'Password deleted successfully'}), 200
         
     except Exception as e:
@@ -150,14 +240,14 @@ def delete_password(password_id):
 
 @passwords_bp.route('/security-health/', methods=['GET'])
 @jwt_required()
-def get_security_health():
+@with_user_id
+def get_security_health(current_user_id):
     try:
-        current_user_id = int(get_jwt_identity())
-        passwords = Password.query.filter_by(user_id=current_user_id).all()
-        
-        total_passwords = len(passwords)
-        weak_passwords = sum(1 for p in passwords if p.is_weak)
-        reused_passwords = sum(1 for p in passwords if p.is_reused)
+        total_passwords, weak_passwords, reused_passwords = db.session.query(
+            db.func.count(Password.id),
+            db.func.coalesce(db.func.sum(db.cast(Password.is_weak, db.Integer)), 0),
+            db.func.coalesce(db.func.sum(db.cast(Password.is_reused, db.Integer)), 0)
+        ).filter(Password.user_id == current_user_id).one()
         
         if total_passwords == 0:
             score = 100
@@ -184,27 +274,17 @@ def generate_password():
         
         length = max(8, min(64, length))
         
-        lowercase = string.ascii_lowercase
-        uppercase = string.ascii_uppercase
-        digits = string.digits
-        special = "!@#$%^&*()_+-=[]{}|;:,.<>?"
-        
-        password = [
-            secrets.choice(lowercase),
-            secrets.choice(uppercase),
-            secrets.choice(digits)
-        ]
-        
         if include_special:
-            password.append(secrets.choice(special))
-            all_chars = lowercase + uppercase + digits + special
+            required_classes = REQUIRED_CLASSES + (SPECIAL_CHARACTERS,)
+            all_chars = ALPHABET_WITH_SPECIAL
         else:
-            all_chars = lowercase + uppercase + digits
+            required_classes = REQUIRED_CLASSES
+            all_chars = ALPHABET
         
-        for _ in range(length - len(password)):
-            password.append(secrets.choice(all_chars))
+        password = [_random_chars(chars, 1)[0] for chars in required_classes]
+        password.extend(_random_chars(all_chars, length - len(password)))
         
-        secrets.SystemRandom().shuffle(password)
+        _system_random.shuffle(password)
         generated_password = ''.join(password)
         
         strength = PasswordStrengthChecker.check_strength(generated_password)
@@ -1,47 +1,141 @@
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.backends import default_backend
 import base64
+import hashlib
+import hmac
+import os
+import stat
+import string
+
+CIPHERTEXT_VERSION = b'\x02'
+NONCE_SIZE = 12
+PBKDF2_ITERATIONS = 100000
+KEY_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'securevault', 'keys')
+
+SPECIAL_CHARACTERS = "!@#$%^&*()_+-=[]{}|;:,.<>?"
+
+# Markers are ASCII letters, which are always remapped, so no input char survives as one
+_CHAR_CLASSES = str.maketrans({
+    **dict.fromkeys(string.ascii_uppercase, 'U'),
+    **dict.fromkeys(string.ascii_lowercase, 'L'),
+    **dict.fromkeys(string.digits, 'D'),
+    **dict.fromkeys(SPECIAL_CHARACTERS, 'S')
+})
 
 class EncryptionService:
-    def __init__(self, encryption_key=None):
+    def __init__(self, encryption_key=None, cache_keys=False):
+        # The on-disk key cache relies on POSIX ownership and permission checks
+        self.cache_keys = cache_keys and os.name == 'posix'
         if encryption_key:
-            self.key = self._derive_key(encryption_key.encode())
+            raw_key = self._derive_key(encryption_key.encode())
         else:
-            self.key = Fernet.generate_key()
+            raw_key = AESGCM.generate_key(bit_length=256)
+        # Fernet is kept only to read rows written before the switch to AES-GCM
+        self.key = base64.urlsafe_b64encode(raw_key)
         self.cipher = Fernet(self.key)
+        self.aead = AESGCM(self._derive_subkey(raw_key, b'securevault_aes_256_gcm'))
+        self.hmac_key = self._derive_subkey(raw_key, b'securevault_fingerprint')
     
     def _derive_key(self, password, salt=None):
         if salt is None:
             salt = b'securevault_salt_do_not_change!'
-        kdf = PBKDF2HMAC(
+        cache_name = hashlib.sha256(
+            b'\0'.join([password, salt, str(PBKDF2_ITERATIONS).encode()])
+        ).hexdigest()
+        cache_path = os.path.join(KEY_CACHE_DIR, cache_name)
+        
+        key = self._read_cached_key(cache_path) if self.cache_keys else None
+        if key is None:
+            kdf = PBKDF2HMAC(
+                algorithm=hashes.SHA256(),
+                length=32,
+                salt=salt,
+                iterations=PBKDF2_ITERATIONS,
+                backend=default_backend()
+            )
+            key = kdf.derive(password)
+            if self.cache_keys:
+                self._write_cached_key(cache_path, key)
+        return key
+    
+    def _is_private(self, path, file_type):
+        info = os.lstat(path)
+        return (
+            file_type(info.st_mode)
+            and info.st_uid == os.getuid()
+            and not info.st_mode & 0o077
+        )
+    
+    def _read_cached_key(self, path):
+        try:
+            if not self._is_private(KEY_CACHE_DIR, stat.S_ISDIR) or not self._is_private(path, stat.S_ISREG):
+                return None
+            with open(path, 'rb') as f:
+                key = f.read()
+        except OSError:
+            return None
+        return key if len(key) == 32 else None
+    
+    def _write_cached_key(self, path, key):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(KEY_CACHE_DIR, mode=0o700, exist_ok=True)
+            if not self._is_private(KEY_CACHE_DIR, stat.S_ISDIR):
+                return
+            fd = os.open(tmp_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(key)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+    
+    def _derive_subkey(self, key, info):
+        hkdf = HKDF(
             algorithm=hashes.SHA256(),
             length=32,
-            salt=salt,
-            iterations=100000,
+            salt=None,
+            info=info,
             backend=default_backend()
         )
-        key = base64.urlsafe_b64encode(kdf.derive(password))
-        return key
+        return hkdf.derive(key)
     
     def encrypt(self, plaintext):
         if not plaintext:
-            return ""
+            return b""
         try:
-            encrypted = self.cipher.encrypt(plaintext.encode())
-            return encrypted.decode()
+            nonce = os.urandom(NONCE_SIZE)
+            return CIPHERTEXT_VERSION + nonce + self.aead.encrypt(nonce, plaintext.encode(), None)
         except Exception as e:
             raise Exception(f"Encryption failed: {str(e)}")
     
-    def decrypt(self, encrypted_text):
-        if not encrypted_text:
+    def decrypt(self, ciphertext):
+        if not ciphertext:
             return ""
+        if isinstance(ciphertext, str):
+            ciphertext = ciphertext.encode()
         try:
-            decrypted = self.cipher.decrypt(encrypted_text.encode())
+            if not ciphertext.startswith(CIPHERTEXT_VERSION):
+                return self.cipher.decrypt(ciphertext).decode()
+            data = memoryview(ciphertext)[len(CIPHERTEXT_VERSION):]
+            decrypted = self.aead.decrypt(data[:NONCE_SIZE], data[NONCE_SIZE:], None)
             return decrypted.decode()
         except Exception as e:
             raise Exception(f"Decryption failed: {str(e)}")
+    
+    def is_current(self, ciphertext):
+        return ciphertext.startswith(CIPHERTEXT_VERSION)
+    
+    def fingerprint(self, user_id, plaintext):
+        # Scoped per user so equal passwords of different users get different fingerprints
+        message = f"{user_id}:".encode() + plaintext.encode()
+        return hmac.new(self.hmac_key, message, hashlib.sha256).hexdigest()
 
 class PasswordStrengthChecker:
     @staticmethod
@@ -57,17 +151,19 @@ class PasswordStrengthChecker:
         if len(password) >= 12:
             score += 1
         
-        if any(c.isupper() for c in password) and any(c.islower() for c in password):
+        classes = set(password.translate(_CHAR_CLASSES))
+        
+        if 'U' in classes and 'L' in classes:
             score += 1
         else:
             feedback.append("Add uppercase and lowercase letters")
         
-        if any(c.isdigit() for c in password):
+        if 'D' in classes:
             score += 1
         else:
             feedback.append("Add numbers")
         
-        if any(c in "!@#$%^&*()_+-=[]{}|;:,.<>?" for c in password):
+        if 'S' in classes:
             score += 1
         else:
             feedback.append("Add special characters")
@@ -80,16 +176,12 @@ class PasswordStrengthChecker:
             'max_score': 5,
             'feedback': feedback
         }
-    
-    @staticmethod
-    def is_reused(password, existing_passwords):
-        return password in existing_passwords
 
 encryption_service = None
 
-def init_encryption_service(encryption_key):
+def init_encryption_service(encryption_key, cache_keys=False):
     global encryption_service
-    encryption_service = EncryptionService(encryption_key)
+    encryption_service = EncryptionService(encryption_key, cache_keys=cache_keys)
     return encryption_service
 
 def get_encryption_service():
@@ -0,0 +1,13 @@
+from models import db
+from utils.encryption import get_encryption_service, PasswordStrengthChecker
+
+def warmup(app):
+    with app.app_context():
+        encryption_service = get_encryption_service()
+        encryption_service.decrypt(encryption_service.encrypt('warmup'))
+        encryption_service.fingerprint(0, 'warmup')
+        
+        PasswordStrengthChecker.check_strength('Warmup-1')
+        
+        db.session.execute(db.text('SELECT 1'))
+        db.session.remove()
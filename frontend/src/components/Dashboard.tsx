@@ -82,7 +82,7 @@ export function Dashboard({ onLogout }: DashboardProps) {
     
     try {
       // Fetch the full password details with decrypted password
-      const fullPassword = await passwordService.getById(selectedPassword.id);
+      const fullPassword = await passwordService.decrypt(selectedPassword.id);
       
       // Update the selected password with the decrypted password
       setSelectedPassword({
@@ -1,6 +1,8 @@
 import axios, { AxiosInstance } from 'axios';
 
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:5000/api';
+// Largest page the backend serves for /passwords/ (MAX_PAGE_SIZE in routes/passwords.py)
+const MAX_PAGE_SIZE = 200;
 
 class ApiService {
   private api: AxiosInstance;
@@ -70,6 +72,7 @@ export interface Password {
   updated_at: string;
   last_used?: string;
   password?: string;
+  encrypted_password?: string;
 }
 
 export interface SecurityHealth {
@@ -147,11 +150,18 @@ export const passwordService = {
     const params = new URLSearchParams();
     if (filters?.category) params.append('category', filters.category);
     if (filters?.search) params.append('search', filters.search);
-    
-    const queryString = params.toString();
-    const url = queryString ? `/passwords/?${queryString}` : '/passwords/';
-    const response = await apiService.instance.get(url);
-    return response.data.passwords;
+    params.append('limit', String(MAX_PAGE_SIZE));
+
+    const passwords: Password[] = [];
+    let cursor: string | null = null;
+    do {
+      if (cursor) params.set('cursor', cursor);
+      const response = await apiService.instance.get(`/passwords/?${params.toString()}`);
+      passwords.push(...response.data.passwords);
+      cursor = response.data.next_cursor;
+    } while (cursor);
+
+    return passwords;
   },
 
   async getById(id: number): Promise<Password> {
@@ -159,6 +169,11 @@ export const passwordService = {
     return response.data;
   },
 
+  async decrypt(id: number): Promise<Password> {
+    const response = await apiService.instance.get(`/passwords/${id}/decrypt/`);
+    return response.data;
+  },
+
   async create(data: {
     service_name: string;
     password: string;